@@ -10,6 +10,7 @@ import time
 import tracemalloc
 import matplotlib.pyplot as plt
 import functools
+import json
 
 def time_and_memory(func):
     @functools.wraps(func)
@@ -32,23 +33,23 @@ def time_and_memory(func):
 # Define classes for MakeParts, PurchaseParts, Suppliers, Modules
 
 class MakeParts:
-    def __init__(self, part_id, parent_id):
+    def __init__(self, part_id, parent_id, rng=random):
         self.part_id = part_id
         self.part_name = f"MakePart_{part_id}"
-        self.date_manufacturing = self.random_date()
-        self.available_quantity = random.randint(100, 1000)
-        self.manufacturing_cost = round(random.uniform(10, 100), 2)
-        self.manufacturing_time = random.randint(1, 30)
-        self.quality_control_status = random.choice(['Passed', 'Failed', 'Pending'])
+        self.date_manufacturing = self.random_date(rng)
+        self.available_quantity = rng.randint(100, 1000)
+        self.manufacturing_cost = round(rng.uniform(10, 100), 2)
+        self.manufacturing_time = rng.randint(1, 30)
+        self.quality_control_status = rng.choice(['Passed', 'Failed', 'Pending'])
         self.parent_id = parent_id
         self.label = "make parts"
-        self.edge_weight = random.randint(10, 100)
+        self.edge_weight = rng.randint(10, 100)
 
-    def random_date(self):
+    def random_date(self, rng=random):
         start_date = datetime(2020, 1, 1)
         end_date = datetime(2024, 1, 1)
         time_between_dates = end_date - start_date
-        random_number_of_days = random.randrange(time_between_dates.days)
+        random_number_of_days = rng.randrange(time_between_dates.days)
         return start_date + timedelta(days=random_number_of_days)
 
     def to_csv_row(self):
@@ -58,24 +59,24 @@ class MakeParts:
 
 
 class PurchaseParts:
-    def __init__(self, part_id, parent_id, supplier_id):
+    def __init__(self, part_id, parent_id, supplier_id, rng=random):
         self.part_id = part_id
         self.part_name = f"PurchasePart_{part_id}"
         self.supplier_id = supplier_id
-        self.date_purchased = self.random_date()
-        self.available_quantity = random.randint(100, 1000)
-        self.cost_per_unit = round(random.uniform(5, 50), 2)
-        self.lead_time = random.randint(1, 30)
-        self.warranty_period = random.randint(30, 365)
+        self.date_purchased = self.random_date(rng)
+        self.available_quantity = rng.randint(100, 1000)
+        self.cost_per_unit = round(rng.uniform(5, 50), 2)
+        self.lead_time = rng.randint(1, 30)
+        self.warranty_period = rng.randint(30, 365)
         self.parent_id = parent_id
         self.label = "Purchase_Parts"
-        self.edge_weight = random.randint(10, 100)
+        self.edge_weight = rng.randint(10, 100)
 
-    def random_date(self):
+    def random_date(self, rng=random):
         start_date = datetime(2020, 1, 1)
         end_date = datetime(2024, 1, 1)
         time_between_dates = end_date - start_date
-        random_number_of_days = random.randrange(time_between_dates.days)
+        random_number_of_days = rng.randrange(time_between_dates.days)
         return start_date + timedelta(days=random_number_of_days)
 
     def to_csv_row(self):
@@ -85,13 +86,13 @@ class PurchaseParts:
 
 
 class Suppliers:
-    def __init__(self, supplier_id, parent_id):
+    def __init__(self, supplier_id, parent_id, rng=random):
         self.supplier_id = supplier_id
         self.supplier_name = f"Supplier_{supplier_id}"
-        self.contact_details = f"+1-555-{random.randint(100, 999)}-{random.randint(1000, 9999)}"
-        self.location = random.choice(['USA', 'China', 'Germany', 'Japan', 'UK'])
+        self.contact_details = f"+1-555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+        self.location = rng.choice(['USA', 'China', 'Germany', 'Japan', 'UK'])
         self.label = "Suppliers"
-        self.edge_weight = random.randint(10, 100)
+        self.edge_weight = rng.randint(10, 100)
         self.parent_id = parent_id
 
     def to_csv_row(self):
@@ -99,11 +100,11 @@ class Suppliers:
 
 
 class Modules:
-    def __init__(self, module_id, parent_id):
+    def __init__(self, module_id, parent_id, rng=random):
         self.module_id = module_id
         self.module_name = f"Module_{module_id}"
         self.label = "Module"
-        self.edge_weight = random.randint(10, 100)
+        self.edge_weight = rng.randint(10, 100)
         self.parent_id = parent_id
 
     def to_csv_row(self):
@@ -165,147 +166,306 @@ def analyze_generation_time(expand_graph_function, existing_nodes, max_new_nodes
     
 
 
-# Function to expand graph and generate CSV
-@time_and_memory
-def expand_graph_csv(existing_nodes_level_3, total_new_nodes, levels_to_add):
-    current_node_id = 1
-    parent_ids = existing_nodes_level_3
-    generated_files = []
-    suppliers = {}
-
-    factor = math.exp(math.log(total_new_nodes) / levels_to_add)
-    num_modules = math.ceil(factor)*2
-
-    csv_filename = "level_4_modules.csv"
-    level_nodes = []
-    with open(csv_filename, mode='w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(['ID', 'Name', 'Label', 'Edge_weight', 'ParentID'])
-        for i in range(num_modules):
-            module = Modules(str(current_node_id), random.choice(parent_ids))
-            writer.writerow(module.to_csv_row())
-            level_nodes.append(current_node_id)
-            current_node_id += 1
-
-    generated_files.append(csv_filename)
-    parent_ids = level_nodes
-
-    for level in range(2, levels_to_add + 1):
-        level_nodes = []
-        nodes_in_this_level = min(math.ceil(factor ** level), total_new_nodes - current_node_id + 1)
-
-        csv_filename = f"level_{level + 3}.csv"
-
-        with open(csv_filename, mode='w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['ID', 'ParentID', 'Name', 'Attribute1', 'Attribute2', 'Attribute3', 'Attribute4', 'Attribute5', 'Label', 'Edge_Weight'])
+LEVEL_PROFILES = ['geometric', 'uniform', 'linear']
+MANIFEST_FILENAME = "manifest.json"
 
-            purchase_part_probability = min(0.4 + (level / levels_to_add) * 0.6, 1.0)
 
-            for i in range(nodes_in_this_level):
-                node_id = str(current_node_id)
-                parent_id = random.choice(parent_ids)
+def purchase_part_probability(level, levels_to_add):
+    # Share of purchase parts grows with depth and reaches 1.0 at the last level
+    return min(0.4 + (level / levels_to_add) * 0.6, 1.0)
 
-                if random.random() <= purchase_part_probability:
-                    supplier_id = f"S{current_node_id + 1}"  # Next ID will be for the supplier
-                    node = PurchaseParts(node_id, parent_id, supplier_id)
-                    writer.writerow(node.to_csv_row())
-                    current_node_id += 1
 
-                    # Create and write supplier node
-                    supplier = Suppliers(supplier_id, node_id)  # Parent is the PurchaseParts node
-                    writer.writerow(supplier.to_csv_row())
-                    current_node_id += 1
+def plan_levels(total_new_nodes, levels_to_add, profile='geometric'):
+    """
+    Split exactly ``total_new_nodes`` nodes, suppliers included, across the levels.
 
-                else:
-                    node = MakeParts(node_id, parent_id)
-                    writer.writerow(node.to_csv_row())
-                    level_nodes.append(node_id)
-                    current_node_id += 1
+    Parameters:
+        total_new_nodes (int): Exact number of nodes to generate.
+        levels_to_add (int): Number of levels; the first one holds the modules.
+        profile (str): How the budget grows with depth: 'geometric' (each level a
+            constant factor larger), 'uniform' or 'linear'.
+
+    Returns:
+        list of dict: Per level, its file name and the number of modules, make parts,
+        purchase parts and suppliers, whose ``nodes`` add up to ``total_new_nodes``.
+    """
+    if profile not in LEVEL_PROFILES:
+        raise ValueError(f"Unknown profile '{profile}', expected one of {LEVEL_PROFILES}")
+    if total_new_nodes < levels_to_add:
+        raise ValueError(f"Need at least {levels_to_add} nodes to fill {levels_to_add} levels")
+
+    if profile == 'geometric':
+        factor = math.exp(math.log(total_new_nodes) / levels_to_add)
+        weights = [factor ** level for level in range(1, levels_to_add + 1)]
+    elif profile == 'uniform':
+        weights = [1] * levels_to_add
+    else:
+        weights = list(range(1, levels_to_add + 1))
+
+    # Every level gets one node, the rest is shared by largest remainder
+    spare = total_new_nodes - levels_to_add
+    shares = [spare * weight / sum(weights) for weight in weights]
+    budgets = [1 + math.floor(share) for share in shares]
+    by_remainder = sorted(range(levels_to_add), key=lambda i: shares[i] - math.floor(shares[i]), reverse=True)
+    for i in by_remainder[:total_new_nodes - sum(budgets)]:
+        budgets[i] += 1
+
+    plan = [{'level': 4, 'file': "level_4_modules.csv", 'modules': budgets[0],
+             'make_parts': 0, 'purchase_parts': 0, 'suppliers': 0, 'nodes': budgets[0]}]
+    for level in range(2, levels_to_add + 1):
+        budget = budgets[level - 1]
+        # Each purchase part brings a supplier, so p purchase parts cost 2p nodes
+        probability = purchase_part_probability(level, levels_to_add)
+        purchase = min(round(budget * probability / (1 + probability)), budget // 2)
+        if level < levels_to_add and budget - 2 * purchase < 1:
+            purchase = (budget - 1) // 2  # keep a make part to parent the next level
+        make = budget - 2 * purchase
+        plan.append({'level': level + 3, 'file': f"level_{level + 3}.csv", 'modules': 0,
+                     'make_parts': make, 'purchase_parts': purchase, 'suppliers': purchase, 'nodes': budget})
+    return plan
+
+
+def write_manifest(plan, counts, total_new_nodes, levels_to_add, profile, seed, filename=MANIFEST_FILENAME):
+    manifest = {
+        'requested_nodes': total_new_nodes,
+        'levels_to_add': levels_to_add,
+        'profile': profile,
+        'seed': seed,
+        'generated_nodes': sum(level['nodes'] for level in counts),
+        'plan': plan,
+        'levels': counts,
+    }
+    with open(filename, mode='w') as file:
+        json.dump(manifest, file, indent=2)
+    return filename
+
+
+PARTITIONS_DIR = "partitions"
+PARTITION_MANIFEST_FILENAME = "partition_manifest.json"
+
+
+def partition_path(series_node, filename):
+    # 'Flex Product Family - Series a' -> partitions/Flex_Product_Family/Series_a/<filename>
+    family, _, series = series_node.partition(' - ')
+    return os.path.join(PARTITIONS_DIR, family.replace(' ', '_'), series.replace(' ', '_'), filename)
+
+
+class LevelFiles:
+    # CSV writers for one level: a single file, or one file per series when partitioned
+    def __init__(self, filename, header, partitioned):
+        self.filename = filename
+        self.header = header
+        self.partitioned = partitioned
+        self.files = {}  # series node (None when flat) -> [file, writer, path, rows]
+
+    def writerow(self, series_node, row):
+        key = series_node if self.partitioned else None
+        if key not in self.files:
+            path = partition_path(key, self.filename) if self.partitioned else self.filename
+            if self.partitioned:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            file = open(path, mode='w', newline='')
+            writer = csv.writer(file)
+            writer.writerow(self.header)
+            self.files[key] = [file, writer, path, 0]
+        entry = self.files[key]
+        entry[1].writerow(row)
+        entry[3] += 1
+
+    def close(self):
+        # Returns {series node or None: (path, rows written)}
+        written = {}
+        for key, (file, _, path, rows) in self.files.items():
+            file.close()
+            written[key] = (path, rows)
+        return written
+
+
+def write_partition_manifest(level_outputs, filename=PARTITION_MANIFEST_FILENAME):
+    # One entry per series with the files that hold its subtree, in level order
+    partitions = {}
+    for level, written in level_outputs:
+        for series_node, (path, rows) in written.items():
+            family, _, series = series_node.partition(' - ')
+            entry = partitions.setdefault(series_node, {'node': series_node, 'family': family, 'series': series,
+                                                        'rows': 0, 'bytes': 0, 'files': []})
+            size = os.path.getsize(path)
+            entry['files'].append({'path': path, 'level': level, 'rows': rows, 'bytes': size})
+            entry['rows'] += rows
+            entry['bytes'] += size
+    with open(filename, mode='w') as file:
+        json.dump({'partitions': list(partitions.values())}, file, indent=2)
+    return filename
 
-                if current_node_id > total_new_nodes:
-                    break
 
-        generated_files.append(csv_filename)
-        parent_ids = level_nodes
+# Function to expand graph and generate CSV
+@time_and_memory
+def expand_graph_csv(existing_nodes_level_3, total_new_nodes, levels_to_add, profile='geometric', seed=None, layout='flat'):
+    # A seed is always recorded in the manifest so any run can be repeated.
+    # The run draws from its own generator and leaves the global one alone.
+    if seed is None:
+        seed = random.randrange(2**32)
+    rng = random.Random(seed)
+
+    # With layout='partitioned' every series' subtree goes to its own files
+    partitioned = layout == 'partitioned'
+    plan = plan_levels(total_new_nodes, levels_to_add, profile)
+    counts = []
+    level_outputs = []
+    current_node_id = 1
+    # Parents are (node ID, series the subtree belongs to)
+    parents = [(node, node) for node in existing_nodes_level_3]
+
+    level_plan = plan[0]
+    files = LevelFiles(level_plan['file'], ['ID', 'Name', 'Label', 'Edge_weight', 'ParentID'], partitioned)
+    level_nodes = [None] * level_plan['modules']
+    for i in range(level_plan['modules']):
+        parent_id, series = rng.choice(parents)
+        module = Modules(str(current_node_id), parent_id, rng)
+        files.writerow(series, module.to_csv_row())
+        level_nodes[i] = (module.module_id, series)
+        current_node_id += 1
+
+    counts.append(dict(level_plan))
+    level_outputs.append((level_plan['level'], files.close()))
+    parents = level_nodes
+
+    for level_plan in plan[1:]:
+        files = LevelFiles(level_plan['file'], ['ID', 'ParentID', 'Name', 'Attribute1', 'Attribute2', 'Attribute3', 'Attribute4', 'Attribute5', 'Label', 'Edge_Weight'], partitioned)
+
+        # Node kinds for this level in random order, sized from the plan
+        is_purchase = [True] * level_plan['purchase_parts'] + [False] * level_plan['make_parts']
+        rng.shuffle(is_purchase)
+        level_nodes = [None] * level_plan['make_parts']
+        made = purchased = 0
+
+        for purchase in is_purchase:
+            node_id = str(current_node_id)
+            parent_id, series = rng.choice(parents)
+
+            if purchase:
+                supplier_id = f"S{current_node_id + 1}"  # Next ID will be for the supplier
+                node = PurchaseParts(node_id, parent_id, supplier_id, rng)
+                files.writerow(series, node.to_csv_row())
+                current_node_id += 1
+
+                # Create and write supplier node
+                supplier = Suppliers(supplier_id, node_id, rng)  # Parent is the PurchaseParts node
+                files.writerow(series, supplier.to_csv_row())
+                current_node_id += 1
+                purchased += 1
+
+            else:
+                node = MakeParts(node_id, parent_id, rng)
+                files.writerow(series, node.to_csv_row())
+                level_nodes[made] = (node_id, series)
+                current_node_id += 1
+                made += 1
+
+        counts.append({'level': level_plan['level'], 'file': level_plan['file'], 'modules': 0,
+                       'make_parts': made, 'purchase_parts': purchased, 'suppliers': purchased,
+                       'nodes': made + 2 * purchased})
+        level_outputs.append((level_plan['level'], files.close()))
+        parents = level_nodes
+
+    generated_files = [path for _, written in level_outputs for path, _ in written.values()]
+    generated_files.append(write_manifest(plan, counts, total_new_nodes, levels_to_add, profile, seed))
+    if partitioned:
+        generated_files.append(write_partition_manifest(level_outputs))
+    return generated_files
 
-        if current_node_id > total_new_nodes:
-            break
 
-    return generated_files
+# Series nodes (level 3) that generated modules attach to
+existing_nodes = ['Kiyo Product Family - Series a', 'Kiyo Product Family - Series b', 'Kiyo Product Family - Series c', 'Kiyo Product Family - Series d', 'Kiyo Product Family - Series e', 'Kiyo Product Family - Series f', 'Coronus Product Family - Series a', 'Coronus Product Family - Series b', 'Coronus Product Family - Series c', 'Coronus Product Family - Series d', 'Coronus Product Family - Series e', 'Coronus Product Family - Series f',
+                'Flex Product Family - Series a', 'Flex Product Family - Series b', 'Flex Product Family - Series c', 'Flex Product Family - Series d', 'Flex Product Family - Series e', 'Flex Product Family - Series f', 'Versys Metal Product Family - Series a', 'Versys Metal Product Family - Series b', 'Versys Metal Product Family - Series c', 'Versys Metal Product Family - Series d', 'Versys Metal Product Family - Series e', 'Versys Metal Product Family - Series f']
 
 
 # Streamlit App Interface
-st.title("Graph Expansion and CSV Generator")
-with st.expander("Show Schema Details"):
+def app():
+    st.title("Graph Expansion and CSV Generator")
+    with st.expander("Show Schema Details"):
     
-    st.header("Make_Parts Table")
-    make_parts_table = """
-    | *Attribute*              | *Type*          |
-    |---------------------------|------------------|
-    | Part_ID                   | String           |
-    | Label                     | Make Parts       |
-    | Part_Name                 | String           |
-    | Date_Manufacturing        | Date             |
-    | Available_Quantity         | Integer         |
-    | Manufacturing_Cost        | Decimal          |
-    | Manufacturing_Time        | Integer          |
-    | Quality_Control_Status    | String           |
-    | Parent_ID                 | String (FK)     |
-    """
-    st.markdown(make_parts_table)
-
-    # Purchase_Parts Table
-    st.header("Purchase_Parts Table")
-    purchase_parts_table = """
-    | *Attribute*              | *Type*          |
-    |---------------------------|------------------|
-    | Part_ID                   | String           |
-    | Label                     | Purchase Parts   |
-    | Part_Name                 | String           |
-    | Supplier_ID               | String (FK)     |
-    | Date_Purchased            | Date             |
-    | Available_Quantity         | Integer         |
-    | Cost_Per_Unit            | Decimal          |
-    | Lead_Time                 | Integer          |
-    | Warranty_Period           | Integer          |
-    | Parent_ID                 | String (FK)     |
-    """
-    st.markdown(purchase_parts_table)
-
-    # Suppliers Table
-    st.header("Suppliers Table")
-    suppliers_table = """
-    | *Attribute*              | *Type*          |
-    |---------------------------|------------------|
-    | Supplier_ID               | String           |
-    | Label                     | Supplier         |
-    | Supplier_Name             | String           |
-    | Contact_Details           | String           |
-    | Location                  | String           |
-    """
-    st.markdown(suppliers_table)
+        st.header("Make_Parts Table")
+        make_parts_table = """
+        | *Attribute*              | *Type*          |
+        |---------------------------|------------------|
+        | Part_ID                   | String           |
+        | Label                     | Make Parts       |
+        | Part_Name                 | String           |
+        | Date_Manufacturing        | Date             |
+        | Available_Quantity         | Integer         |
+        | Manufacturing_Cost        | Decimal          |
+        | Manufacturing_Time        | Integer          |
+        | Quality_Control_Status    | String           |
+        | Parent_ID                 | String (FK)     |
+        """
+        st.markdown(make_parts_table)
+
+        # Purchase_Parts Table
+        st.header("Purchase_Parts Table")
+        purchase_parts_table = """
+        | *Attribute*              | *Type*          |
+        |---------------------------|------------------|
+        | Part_ID                   | String           |
+        | Label                     | Purchase Parts   |
+        | Part_Name                 | String           |
+        | Supplier_ID               | String (FK)     |
+        | Date_Purchased            | Date             |
+        | Available_Quantity         | Integer         |
+        | Cost_Per_Unit            | Decimal          |
+        | Lead_Time                 | Integer          |
+        | Warranty_Period           | Integer          |
+        | Parent_ID                 | String (FK)     |
+        """
+        st.markdown(purchase_parts_table)
+
+        # Suppliers Table
+        st.header("Suppliers Table")
+        suppliers_table = """
+        | *Attribute*              | *Type*          |
+        |---------------------------|------------------|
+        | Supplier_ID               | String           |
+        | Label                     | Supplier         |
+        | Supplier_Name             | String           |
+        | Contact_Details           | String           |
+        | Location                  | String           |
+        """
+        st.markdown(suppliers_table)
+
+    total_new_nodes = st.number_input("Total New Nodes", min_value=1, max_value=10000000, value=1000)
+    levels_to_add = st.number_input("Levels to Add", min_value=1, max_value=10, value=4)
+    profile = st.selectbox("Level Shape", LEVEL_PROFILES,
+                           help="How the node budget grows from the modules level to the deepest level")
+    seed = st.number_input("Random Seed", min_value=0, value=0, help="0 picks a new seed; it is recorded in manifest.json")
+    partitioned = st.checkbox("Partition by product family and series",
+                              help="Write each series' subtree to its own files under partitions/ with a partition manifest, so the querying page can load only what a query needs")
+
+    if total_new_nodes < levels_to_add:
+        st.error(f"Total New Nodes must be at least {levels_to_add} to fill {levels_to_add} levels.")
+        return
+    with st.expander("Show Planned Level Sizes"):
+        st.dataframe(plan_levels(total_new_nodes, levels_to_add, profile))
+
+    if st.button('Generate Graph Data'):
+        generated_files = expand_graph_csv(existing_nodes, total_new_nodes, levels_to_add, profile, seed or None,
+                                           layout='partitioned' if partitioned else 'flat')
+        st.success(f"Generated {len(generated_files)} files")
+
+        # Create ZIP file in memory
+        zip_file = create_zip(generated_files)
+    
+        # Provide a download button
+        st.download_button(
+            label="Download All Files as ZIP",
+            data=zip_file,
+            file_name="graph_data.zip",
+            mime="application/zip"
+        )
 
-# User input
-existing_nodes = ['Kiyo Product Family - Series a', 'Kiyo Product Family - Series b', 'Kiyo Product Family - Series c', 'Kiyo Product Family - Series d', 'Kiyo Product Family - Series e', 'Kiyo Product Family - Series f', 'Coronus Product Family - Series a', 'Coronus Product Family - Series b', 'Coronus Product Family - Series c', 'Coronus Product Family - Series d', 'Coronus Product Family - Series e', 'Coronus Product Family - Series f',
-                'Flex Product Family - Series a', 'Flex Product Family - Series b', 'Flex Product Family - Series c', 'Flex Product Family - Series d', 'Flex Product Family - Series e', 'Flex Product Family - Series f', 'Versys Metal Product Family - Series a', 'Versys Metal Product Family - Series b', 'Versys Metal Product Family - Series c', 'Versys Metal Product Family - Series d', 'Versys Metal Product Family - Series e', 'Versys Metal Product Family - Series f']
-total_new_nodes = st.number_input("Total New Nodes", min_value=1, max_value=10000000, value=1000)
-levels_to_add = st.number_input("Levels to Add", min_value=1, max_value=10, value=4)
+    if st.button('Analyze generation time'):
+        analyze_generation_time(expand_graph_csv, existing_nodes, max_new_nodes=total_new_nodes, step=100, levels_to_add=levels_to_add)
 
-if st.button('Generate Graph Data'):
-    generated_files = expand_graph_csv(existing_nodes, total_new_nodes, levels_to_add)
-    st.success(f"Generated {len(generated_files)} files")
 
-    # Create ZIP file in memory
-    zip_file = create_zip(generated_files)
-    
-    # Provide a download button
-    st.download_button(
-        label="Download All Files as ZIP",
-        data=zip_file,
-        file_name="graph_data.zip",
-        mime="application/zip"
-    )
-
-if st.button('Analyze generation time'):
-    analyze_generation_time(expand_graph_csv, existing_nodes, max_new_nodes=total_new_nodes, step=100, levels_to_add=levels_to_add)
+# Run the app
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,315 @@
+"""Headless end-to-end scale test: generate a BOM, load it, replay a query mix.
+
+For every scale the BOM is generated with ``expand_graph_csv``, loaded through the
+streaming ``IngestionJob`` used by the querying page, and a weighted mix of the
+page's queries is replayed against random valid nodes. Each scale runs in a fresh
+process so resident memory is not inflated by the previous one. Every scale also
+checks that removing loaded files leaves the same graph as a fresh load of the rest.
+
+Example:
+    python benchmark.py --scales 1000,10000,100000 --queries 500
+    python benchmark.py --save-baseline            # record bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+import networkx as nx
+
+DEFAULT_MIX = "search=4,statistics=1,subgraph=2,shortest_path=2,total_cost=2,count_parts=1,expiry=2,find_supplier=2,quality_control=2,node_features=2,critical_path=2"
+
+
+def parse_mix(spec):
+    # "subgraph=2,total_cost=1" -> {'subgraph': 2.0, 'total_cost': 1.0}
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in QUERIES:
+            raise argparse.ArgumentTypeError(f"unknown query '{name}', expected one of {', '.join(QUERIES)}")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+def resident_memory_mb():
+    # Current RSS from /proc where available, otherwise the peak RSS
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _shortest_path_from_root(graph, node):
+    # The shortest path page starts from 'Business Group' by default
+    try:
+        return nx.shortest_path(graph, "Business Group", node)
+    except nx.NetworkXNoPath:
+        return None
+
+
+# Query name -> (labels of the nodes it is run against, function(graph, node)).
+# A label set of None means any node.
+def _queries(search_index, critical_path):
+    from pages import Querying
+
+    return {
+        'search': (None, lambda graph, node: search_index.search(node[:max(1, len(node) - 2)])),
+        'statistics': (None, lambda graph, node: (graph.number_of_nodes(), graph.number_of_edges())),
+        # First table page of the radius-2 subgraph, as the subgraph page shows it
+        'subgraph': (None, lambda graph, node: Querying.SubgraphView(graph, node, 2).page(0, 100)),
+        'shortest_path': (None, _shortest_path_from_root),
+        'total_cost': ({'make parts', 'Purchase_Parts'}, Querying.compute_total_cost),
+        'count_parts': ({'make parts', 'Purchase_Parts', 'Module'}, Querying.count_parts),
+        'expiry': ({'make parts'}, Querying.is_part_expired),
+        'find_supplier': ({'Purchase_Parts'}, Querying.find_suppliers),
+        'quality_control': ({'make parts'}, lambda graph, node: graph.nodes[node].get('quality_control_status')),
+        'node_features': (None, lambda graph, node: dict(graph.nodes[node])),
+        'critical_path': (None, lambda graph, node: critical_path.lookup(node)),
+    }
+
+
+QUERIES = ['search', 'statistics', 'subgraph', 'shortest_path', 'total_cost', 'count_parts',
+           'expiry', 'find_supplier', 'quality_control', 'node_features', 'critical_path']
+
+
+def _load(job, uploads):
+    job.submit(uploads)
+    while not job.done:
+        time.sleep(0.01)
+    if job.error:
+        raise RuntimeError(job.error)
+
+
+def check_removal_matches_fresh_load(paths, removals=2):
+    # Loading every file and then removing some one at a time must leave the same
+    # graph as loading only the files that remain
+    from pages import Querying
+
+    job = Querying.IngestionJob(Querying.build_base_graph())
+    _load(job, [Querying.LocalUpload(path) for path in paths])
+    remaining = list(paths)
+    for _ in range(min(removals, len(paths))):
+        remaining.pop(0)
+        _load(job, [Querying.LocalUpload(path) for path in remaining])
+    fresh = Querying.IngestionJob(Querying.build_base_graph())
+    _load(fresh, [Querying.LocalUpload(path) for path in remaining])
+    return (dict(job.graph.nodes(data=True)) == dict(fresh.graph.nodes(data=True))
+            and set(job.graph.edges) == set(fresh.graph.edges))
+
+
+def run_scale(scale, levels, profile, mix, num_queries, seed):
+    # Runs in a child process: generate, load and query one BOM size
+    import Generator
+    from pages import Querying
+
+    random.seed(seed)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            start = time.perf_counter()
+            files = Generator.expand_graph_csv.__wrapped__(Generator.existing_nodes, scale, levels, profile, seed)
+            generate_seconds = time.perf_counter() - start
+            uploads = [Querying.LocalUpload(os.path.join(workdir, f)) for f in files if f.endswith('.csv')]
+            bytes_on_disk = sum(upload.size for upload in uploads)
+
+            rss_before = resident_memory_mb()
+            job = Querying.IngestionJob(Querying.build_base_graph())
+            # Derived indexes are built during the load, as on the querying page
+            search_index = Querying.NodeSearchIndex(job.graph)
+            job.listeners.append(search_index.apply_changes)
+            critical_path = Querying.CriticalPathIndex(job.graph)
+            job.listeners.append(critical_path.apply_changes)
+            start = time.perf_counter()
+            job.submit(uploads)
+            while not job.done:
+                time.sleep(0.01)
+            load_seconds = time.perf_counter() - start
+            rss_after = resident_memory_mb()
+            delta_consistent = check_removal_matches_fresh_load([os.path.join(workdir, f) for f in files if f.endswith('.csv')])
+        finally:
+            os.chdir(cwd)
+
+    if job.error:
+        raise RuntimeError(f"load failed at scale {scale}: {job.error}")
+    graph = job.graph
+    queries = _queries(search_index, critical_path)
+
+    # Node pools per query, built outside the timed section
+    all_nodes = list(graph.nodes)
+    pools = {}
+    for name in mix:
+        labels = queries[name][0]
+        pools[name] = all_nodes if labels is None else [n for n, d in graph.nodes(data=True) if d.get('label') in labels]
+
+    names = [name for name in mix if pools[name]]
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    for name in random.choices(names, weights=weights, k=num_queries) if names else []:
+        node = random.choice(pools[name])
+        func = queries[name][1]
+        start = time.perf_counter()
+        func(graph, node)
+        latencies[name].append((time.perf_counter() - start) * 1000)
+
+    query_stats = {}
+    for name, values in latencies.items():
+        values.sort()
+        query_stats[name] = {
+            'count': len(values),
+            'p50_ms': percentile(values, 0.50),
+            'p95_ms': percentile(values, 0.95),
+            'p99_ms': percentile(values, 0.99),
+        }
+
+    return {
+        'nodes': graph.number_of_nodes(),
+        'edges': graph.number_of_edges(),
+        'rows': job.rows_done,
+        'csv_bytes': bytes_on_disk,
+        'generate_seconds': generate_seconds,
+        'load_seconds': load_seconds,
+        'load_rows_per_sec': job.rows_done / load_seconds if load_seconds else 0.0,
+        'rss_mb': rss_after,
+        'graph_rss_mb': rss_after - rss_before,
+        'delta_consistent': delta_consistent,
+        'queries': query_stats,
+    }
+
+
+def _run_scale_args(args):
+    return run_scale(*args)
+
+
+def config_differences(config, baseline):
+    # Settings that differ from the baseline's, as "name: baseline -> current"
+    # (compared after a JSON round trip, as the baseline was stored)
+    current = json.loads(json.dumps(config))
+    previous = baseline.get('config', {})
+    return [f"{key}: {previous.get(key)!r} -> {current[key]!r}"
+            for key in current if previous.get(key) != current[key]]
+
+
+def compare_to_baseline(results, baseline, tolerance, min_latency_ms):
+    # Returns human-readable regression messages
+    regressions = []
+    for scale, current in results.items():
+        previous = baseline.get('scales', {}).get(scale)
+        if previous is None:
+            continue
+        if current['load_rows_per_sec'] < previous['load_rows_per_sec'] * (1 - tolerance):
+            regressions.append(f"scale {scale}: load throughput {current['load_rows_per_sec']:,.0f} rows/sec "
+                               f"vs baseline {previous['load_rows_per_sec']:,.0f}")
+        if current['rss_mb'] > previous['rss_mb'] * (1 + tolerance):
+            regressions.append(f"scale {scale}: resident memory {current['rss_mb']:.1f} MiB "
+                               f"vs baseline {previous['rss_mb']:.1f}")
+        for name, stats in current['queries'].items():
+            old = previous.get('queries', {}).get(name)
+            if old is None:
+                continue
+            for key in ('p50_ms', 'p95_ms'):
+                if stats[key] > max(old[key] * (1 + tolerance), min_latency_ms):
+                    regressions.append(f"scale {scale}: {name} {key} {stats[key]:.3f} vs baseline {old[key]:.3f}")
+    return regressions
+
+
+def print_report(results):
+    for scale, result in results.items():
+        print(f"\n== {int(scale):,} requested nodes: {result['nodes']:,} nodes, {result['edges']:,} edges, "
+              f"{result['csv_bytes'] / 2**20:.1f} MiB of CSV")
+        print(f"   generate {result['generate_seconds']:.2f}s · load {result['load_seconds']:.2f}s "
+              f"({result['load_rows_per_sec']:,.0f} rows/sec) · RSS {result['rss_mb']:.1f} MiB "
+              f"(graph {result['graph_rss_mb']:.1f} MiB)")
+        print(f"   remove files vs fresh load: {'same graph' if result['delta_consistent'] else 'MISMATCH'}")
+        print(f"   {'query':<16}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}")
+        for name, stats in result['queries'].items():
+            print(f"   {name:<16}{stats['count']:>7}{stats['p50_ms']:>11.3f}{stats['p95_ms']:>11.3f}{stats['p99_ms']:>11.3f}")
+
+
+def main(argv=None):
+    import Generator
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='1000,10000,100000',
+                        help="comma-separated total node counts to generate (default: %(default)s)")
+    parser.add_argument('--levels', type=int, default=4, help="levels to add below the series nodes")
+    parser.add_argument('--profile', default='geometric', choices=Generator.LEVEL_PROFILES,
+                        help="shape of the per-level node budget (default: %(default)s)")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help="weighted query mix as name=weight pairs (default: %(default)s)")
+    parser.add_argument('--queries', type=int, default=200, help="queries replayed per scale")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for generation and node choice")
+    parser.add_argument('--output', help="write the results as JSON to this path")
+    parser.add_argument('--baseline', default='bench_baseline.json', help="baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="overwrite the baseline with these results")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="relative slowdown or memory growth reported as a regression")
+    parser.add_argument('--min-latency-ms', type=float, default=0.1,
+                        help="latencies below this are too noisy to flag")
+    args = parser.parse_args(argv)
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for scale in scales:
+        # A fresh process per scale keeps the RSS figures independent
+        with context.Pool(1) as pool:
+            results[str(scale)] = pool.apply(_run_scale_args, ((scale, args.levels, args.profile, args.mix, args.queries, args.seed),))
+
+    print_report(results)
+    inconsistent = [scale for scale, result in results.items() if not result['delta_consistent']]
+    if inconsistent:
+        print("\nRemoving files left a different graph than a fresh load at scales", ', '.join(inconsistent))
+    report = {'config': {'levels': args.levels, 'profile': args.profile, 'mix': args.mix, 'queries': args.queries, 'seed': args.seed},
+              'scales': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return 1 if inconsistent else 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # Latencies and throughput are only comparable for the same settings
+        differences = config_differences(report['config'], baseline)
+        if differences:
+            print(f"\nNot comparing against {args.baseline}: it was recorded with different settings")
+            for message in differences:
+                print("  -", message)
+            print("Re-run with the baseline's settings, or record a new baseline with --save-baseline.")
+            return 2
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_latency_ms)
+        if regressions:
+            print("\nREGRESSIONS against", args.baseline)
+            for message in regressions:
+                print("  -", message)
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 1 if inconsistent else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,25 @@ import matplotlib.pyplot as plt
 import time
 import tracemalloc
 import warnings
-import random
+import codecs
+import contextlib
+import os
+import hashlib
+import json
+import heapq
+import itertools
+import tempfile
+import bisect
+import re
+import threading
+import weakref
+from collections import deque
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is offered only when pyarrow is installed
+    pa = pq = None
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
@@ -27,19 +45,358 @@ def time_and_memory(func):
         
         return result  # Return the result of the wrapped function
     return wrapper
-@time_and_memory
+SEARCH_LIMIT = 50  # matches offered in a node search selectbox
+
+
+def _search_key(text):
+    # Lower-case search key, sharing the original string when it is already lower case
+    key = text.lower()
+    return text if key == text else key
+
+
+class NodeSearchIndex:
+    """Prefix search over node IDs and names, filterable by label.
+
+    Keeps one sorted list of ``(key, node_id)`` per label. Additions from a file
+    are sorted and merged in once, on the loader thread, when the file is
+    applied, so a search only bisects and scans. Entries are checked against the
+    graph when they are returned, so removed or relabelled nodes simply stop
+    matching; stale entries are dropped by a rebuild once they outnumber the
+    live ones.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._sorted = {}   # label -> sorted list of (key, node_id)
+        self._pending = {}  # label -> unsorted (key, node_id) collected while applying changes
+        self._size = 0
+        self._stale = 0
+        self.rebuild()
+
+    def rebuild(self):
+        self._sorted, self._pending = {}, {}
+        self._size = self._stale = 0
+        for node_id, data in self.graph.nodes(data=True):
+            self._add(node_id, data)
+        self._merge_pending()
+
+    def _add(self, node_id, data):
+        entries = self._pending.setdefault(data.get('label', ''), [])
+        entries.append((_search_key(node_id), node_id))
+        self._size += 1
+        name = data.get('name')
+        if name and name != node_id:
+            entries.append((_search_key(name), node_id))
+            self._size += 1
+
+    def apply_changes(self, graph, changes):
+        # IngestionJob listener: index new and changed nodes, count stale entries
+        for node_id in changes['added']:
+            self._add(node_id, graph.nodes[node_id])
+        for node_id in changes['updated']:
+            self._stale += 2
+            self._add(node_id, graph.nodes[node_id])
+        self._stale += 2 * len(changes['removed'])
+        if self._stale > self._size // 2:
+            self.rebuild()
+        else:
+            # Sorted here, on the loader thread, so searches never pay for it
+            self._merge_pending()
+
+    def _merge_pending(self):
+        for label, pending in self._pending.items():
+            pending.sort()
+            current = self._sorted.get(label)
+            self._sorted[label] = list(heapq.merge(current, pending)) if current else pending
+        self._pending = {}
+
+    def labels(self):
+        return sorted(label for label in self._sorted if label)
+
+    def _entries(self, label):
+        return self._sorted.get(label, [])
+
+    def search(self, prefix, labels=None, limit=SEARCH_LIMIT):
+        # Node IDs whose ID or name starts with prefix (case-insensitive), ordered by key
+        prefix = prefix.strip().lower()
+        if labels is None:
+            labels = list(self._sorted)
+        nodes = self.graph.nodes
+        found = []
+        for label in labels:
+            entries = self._entries(label)
+            # A changed node keeps its old ID entry next to the new one, so count nodes, not entries
+            taken = set()
+            for position in range(bisect.bisect_left(entries, (prefix,)), len(entries)):
+                key, node_id = entries[position]
+                if not key.startswith(prefix) or len(taken) >= limit:
+                    break
+                if node_id in taken:
+                    continue
+                data = nodes.get(node_id)
+                # Skip entries left behind by removed or changed nodes
+                if data is None or data.get('label', '') != label or \
+                        key not in (_search_key(node_id), _search_key(data.get('name') or node_id)):
+                    continue
+                found.append((key, node_id))
+                taken.add(node_id)
+        return [node_id for _, node_id in sorted(found)[:limit]]
+
+
+def node_search(label, index, labels=None, key=None, default=""):
+    # Type-ahead node picker backed by the search index
+    query = st.text_input(f"Search {label.lower().rstrip(':')}", value=default, key=f"{key}_query",
+                          placeholder="Type the start of a node ID or name")
+    if labels is None:
+        labels = st.multiselect("Filter by label", index.labels(), key=f"{key}_labels") or None
+    node = st.selectbox(label, index.search(query, labels=labels), key=key)
+
+    # A product family or series picked from a partitioned dataset is only loaded on request
+    dataset = st.session_state.get('partitioned_dataset')
+    if node is not None and dataset is not None:
+        missing = set(dataset.partitions_for(node)) - dataset.loaded
+        if missing and st.button(f"Load this scope ({len(missing)} partitions)", key=f"{key}_load_scope"):
+            dataset.load(missing)
+    return node
+
+
 @st.cache_resource
+def build_search_index(_graph, all_csv):
+    # Keyed on the uploads like add_nodes_from_csv, which returns the same cached graph for them
+    return NodeSearchIndex(_graph)
+
+
+def own_lead_time(data):
+    # Days a node itself adds: lead time to buy it or time to manufacture it
+    label = data.get('label')
+    if label == 'Purchase_Parts':
+        return data.get('lead_time', 0)
+    if label == 'make parts':
+        return data.get('manufacturing_time', 0)
+    return 0
+
+
+class CriticalPathIndex:
+    """Longest cumulative lead/manufacturing time from every node down to a leaf.
+
+    ``total[node]`` is the node's own time plus the largest total among its
+    children and ``next_step[node]`` is the child that gives it, so a
+    schedule-risk lookup is a dict access and the path is read off step by step.
+    Built with one post-order pass and updated by walking up from changed nodes.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.total = {}
+        self.next_step = {}
+        self.rebuild()
+
+    def rebuild(self):
+        self.total, self.next_step = {}, {}
+        for node in self._post_order(self.graph, self.graph):
+            self._compute(node)
+
+    def _post_order(self, nodes, within):
+        # Iterative DFS yielding every node of ``nodes`` after its children in ``within``
+        successors = self.graph.successors
+        visited = set()
+        for start in nodes:
+            if start in visited:
+                continue
+            visited.add(start)
+            stack = [(start, successors(start))]
+            while stack:
+                node, children = stack[-1]
+                for child in children:
+                    if child in within and child not in visited:
+                        visited.add(child)
+                        stack.append((child, successors(child)))
+                        break
+                else:
+                    stack.pop()
+                    yield node
+
+    def _compute(self, node):
+        # Recompute one node from its children; returns True if its total changed
+        best_total, best_child = 0, None
+        for child in self.graph.successors(node):
+            child_total = self.total.get(child, 0)
+            if best_child is None or child_total > best_total:
+                best_total, best_child = child_total, child
+        total = own_lead_time(self.graph.nodes[node]) + best_total
+        changed = self.total.get(node) != total or self.next_step.get(node) != best_child
+        self.total[node] = total
+        self.next_step[node] = best_child
+        return changed
+
+    def apply_changes(self, graph, changes):
+        # IngestionJob listener: refresh changed nodes, then their ancestors while totals move
+        for node in changes['removed']:
+            self.total.pop(node, None)
+            self.next_step.pop(node, None)
+        dirty = {node for node in changes['added'] | changes['updated'] if node in graph}
+        dirty |= {parent for parents in changes['removed'].values() for parent in parents if parent in graph}
+
+        # Children before parents among the changed nodes themselves
+        frontier = set()
+        for node in self._post_order(dirty, dirty):
+            self._compute(node)
+            frontier.update(graph.predecessors(node))
+        frontier -= dirty
+        while frontier:
+            moved = [node for node in frontier if self._compute(node)]
+            frontier = {parent for node in moved for parent in graph.predecessors(node)}
+
+    def lookup(self, node):
+        # (total days, path from node down to the leaf that sets it)
+        path = [node]
+        while self.next_step.get(path[-1]) is not None:
+            path.append(self.next_step[path[-1]])
+        return self.total.get(node, 0), path
+
+
+@st.cache_resource
+def build_critical_path_index(_graph, all_csv):
+    # Keyed on the uploads, like build_search_index
+    return CriticalPathIndex(_graph)
+
+
+@time_and_memory
 def statistics(_graph):
     # Display graph statistics
     st.write(f"Number of nodes: {_graph.number_of_nodes()}")
     st.write(f"Number of edges: {_graph.number_of_edges()}")
 
-@st.cache_resource
-def extract_and_visualize_subgraph(_graph, input_node, radius=None):
-    # Step 1: Extract the subgraph with ego_graph function (nodes within the radius from the input node)
-    subgraph = nx.ego_graph(_graph, input_node, radius=radius)
+# Columns of the subgraph table and exports; attributes a node lacks are left empty
+SUBGRAPH_COLUMNS = ['id', 'parent_id', 'depth', 'name', 'label', 'edge_weight',
+                    'date_manufacturing', 'available_quantity', 'manufacturing_cost', 'manufacturing_time',
+                    'quality_control_status', 'supplier_id', 'date_purchased', 'cost_per_unit', 'lead_time',
+                    'contact_details', 'location']
+EXPORT_BATCH_ROWS = 10000  # rows buffered per Parquet row group
+MAX_DRAW_NODES = 300       # larger subgraphs are only drawn in part
+
+
+class SubgraphView:
+    """Nodes within ``radius`` hops below ``root``, read from the base graph on demand.
+
+    Nothing is copied: the view walks the base graph depth-first each time it is
+    iterated, keeping one successor iterator per level of the current path, so a
+    page of rows or an export batch is all that is held in memory besides a stack
+    as deep as the BOM. Only nodes with several parents are remembered to avoid
+    visiting them twice, which in a BOM tree is next to none.
+    """
+
+    def __init__(self, graph, root, radius):
+        self.graph = graph
+        self.root = root
+        self.radius = radius
+
+    def __iter__(self):
+        # Yields (node_id, parent_id, depth) in depth-first pre-order
+        graph = self.graph
+        shared_seen = {self.root}
+        yield self.root, None, 0
+        stack = [(self.root, graph.successors(self.root))] if self.radius != 0 else []
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child in shared_seen:
+                    continue
+                if graph.in_degree(child) > 1:
+                    shared_seen.add(child)
+                depth = len(stack)
+                yield child, node, depth
+                if self.radius is None or depth < self.radius:
+                    stack.append((child, graph.successors(child)))
+                break
+            else:
+                stack.pop()
+
+    def nodes(self):
+        return (node for node, _, _ in self)
+
+    def edges(self):
+        return ((parent, node) for node, parent, _ in self if parent is not None)
+
+    def _row(self, node, parent, depth):
+        # Table row for SUBGRAPH_COLUMNS
+        data = self.graph.nodes[node]
+        row = {column: data.get(column) for column in SUBGRAPH_COLUMNS[3:]}
+        row.update(id=node, parent_id=parent, depth=depth)
+        return row
+
+    def rows(self):
+        # Table rows, built one node at a time
+        for node, parent, depth in self:
+            yield self._row(node, parent, depth)
+
+    def page(self, number, size):
+        # Rows of page ``number`` (0-based) and whether another page follows;
+        # earlier pages are skipped without building their rows
+        nodes = list(itertools.islice(self, number * size, (number + 1) * size + 1))
+        return [self._row(*node) for node in nodes[:size]], len(nodes) > size
+
+
+def write_subgraph_csv(view, file):
+    writer = csv.DictWriter(file, fieldnames=SUBGRAPH_COLUMNS)
+    writer.writeheader()
+    for row in view.rows():
+        writer.writerow(row)
+
+
+def write_subgraph_parquet(view, path):
+    # Values are written as strings since attribute types differ between labels
+    schema = pa.schema([(column, pa.string()) for column in SUBGRAPH_COLUMNS])
+    with pq.ParquetWriter(path, schema) as writer:
+        rows = view.rows()
+        while True:
+            batch = list(itertools.islice(rows, EXPORT_BATCH_ROWS))
+            if not batch:
+                break
+            columns = {column: [None if row[column] is None else str(row[column]) for row in batch]
+                       for column in SUBGRAPH_COLUMNS}
+            writer.write_table(pa.table(columns, schema=schema))
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SubgraphExport:
+    """A subgraph export written to a temporary file.
+
+    The file is removed when the export is discarded or garbage collected,
+    which happens when the session state holding it goes away, and at exit.
+    """
 
-    # Step 2: Position nodes for better visualization
+    def __init__(self, root, radius, suffix):
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as file:
+            self.path = file.name
+        self.root, self.radius, self.suffix = root, radius, suffix
+        self._cleanup = weakref.finalize(self, _remove_file, self.path)
+
+    def read(self):
+        # Called by the download button only when it is clicked
+        with open(self.path, 'rb') as file:
+            return file.read()
+
+    def discard(self):
+        self._cleanup()
+
+
+def extract_and_visualize_subgraph(_graph, input_node, radius=None):
+    # Step 1: Lazily walk the nodes within the radius from the input node
+    view = SubgraphView(_graph, input_node, radius)
+    nodes = list(itertools.islice(view.nodes(), MAX_DRAW_NODES + 1))
+    if len(nodes) > MAX_DRAW_NODES:
+        st.info(f"Drawing the first {MAX_DRAW_NODES} nodes; browse or export the details below for the rest.")
+        nodes = nodes[:MAX_DRAW_NODES]
+
+    # Step 2: Position nodes of a read-only view of the base graph
+    subgraph = _graph.subgraph(nodes)
     pos = nx.spring_layout(subgraph)
 
     # Step 3: Draw the subgraph
@@ -55,46 +412,80 @@ def extract_and_visualize_subgraph(_graph, input_node, radius=None):
     ax.set_title(f'Subgraph Around Node {input_node} with Radius {radius}')
     st.pyplot(fig)
 
-    return subgraph
+    return view
+
+
+def show_subgraph_details(view):
+    # One page of the subgraph as a table, plus streaming exports
+    page_size = st.selectbox("Rows per page:", [50, 100, 500, 1000], key="subgraph_page_size")
+    page_number = st.number_input("Page:", min_value=1, value=1, step=1, key="subgraph_page") - 1
+    rows, has_more = view.page(page_number, page_size)
+    if rows:
+        st.dataframe(rows)
+        st.caption(f"Rows {page_number * page_size + 1:,}-{page_number * page_size + len(rows):,}"
+                   + (" (more on the next page)" if has_more else " (last page)"))
+    else:
+        st.info("No rows on this page; the subgraph is smaller.")
+
+    formats = ["CSV", "Parquet"] if pq is not None else ["CSV"]
+    export_format = st.radio("Export format:", formats, horizontal=True, key="subgraph_export_format")
+    if st.button("Prepare Export"):
+        previous = st.session_state.pop('subgraph_export', None)
+        if previous is not None:
+            previous.discard()
+
+        # Written row by row to a temporary file rather than built in memory
+        export = SubgraphExport(view.root, view.radius, '.csv' if export_format == "CSV" else '.parquet')
+        if export_format == "CSV":
+            with open(export.path, 'w', newline='') as file:
+                write_subgraph_csv(view, file)
+        else:
+            write_subgraph_parquet(view, export.path)
+        st.session_state['subgraph_export'] = export
+
+    export = st.session_state.get('subgraph_export')
+    if export is not None and (export.root, export.radius) != (view.root, view.radius):
+        # The export belongs to another node or radius
+        export.discard()
+        del st.session_state['subgraph_export']
+    elif export is not None:
+        # The file is read when the button is clicked, not on every rerun
+        st.download_button("Download Subgraph", data=export.read, file_name=f"subgraph_{view.root}{export.suffix}")
+
 
 @time_and_memory
-def subgraph(_graph):
+def subgraph(_graph, index):
     st.title("Subgraph Extraction and Visualization")
 
-    # Step 1: Check if sampled nodes are already in session state, if not, sample new nodes
-    if 'sampled_nodes' not in st.session_state:
-        all_nodes = list(_graph.nodes)[:1000]  # Get the first 1000 nodes
-        # Sample 100 nodes, or fewer if there aren't enough nodes
-        st.session_state.sampled_nodes = random.sample(all_nodes, min(100, len(all_nodes)))
-
-    # Step 2: Selectbox for node ID from the sampled nodes
-    input_node = st.selectbox("Select Node ID:", st.session_state.sampled_nodes)
+    # Step 1-2: Search for the node ID
+    input_node = node_search("Select Node ID:", index, key="subgraph_node")
 
     # Step 3: Slider for radius
     radius = st.slider("Select Radius:", min_value=1, max_value=10, value=2)  # Default radius is 2
 
-    if st.button("Visualize Subgraph"):
+    if input_node is not None and input_node not in _graph:
+        st.error(f"Node {input_node} not found in the graph. Please enter a valid node ID.")
+        return
+
+    if st.button("Visualize Subgraph") and input_node is not None:
         # Step 4: Call the function to extract and visualize the subgraph
-        try:
-            subgraph = extract_and_visualize_subgraph(_graph, input_node, radius)
+        extract_and_visualize_subgraph(_graph, input_node, radius)
+        st.session_state['subgraph_shown'] = (input_node, radius)
 
-            # Step 5: Display some subgraph info
-            with st.expander("Show Subgraph Details"):
-                st.write(f"Subgraph Nodes: {list(subgraph.nodes())}")
-                st.write(f"Subgraph Edges: {list(subgraph.edges())}")
-        except nx.NetworkXError:
-            st.error(f"Node {input_node} not found in the graph. Please enter a valid node ID.")
+    # Step 5: Browse the subgraph a page at a time; it stays open while paging
+    if st.session_state.get('subgraph_shown') == (input_node, radius):
+        with st.expander("Show Subgraph Details"):
+            show_subgraph_details(SubgraphView(_graph, input_node, radius))
 
 @time_and_memory
-def visualize_shortest_path(graph):
-    # Get the list of all nodes in the graph
-    node_list = list(graph.nodes())
-
+def visualize_shortest_path(graph, index):
     # Allow user to select the source and target nodes
-    node_1 = st.text_input('Select the starting node (source)',value= 'Business Group')
-    node_2 = st.text_input('Select the ending node (target)', value= '835')
-
+    node_1 = node_search('Select the starting node (source)', index, key="path_source", default='Business Group')
+    node_2 = node_search('Select the ending node (target)', index, key="path_target", default='835')
 
+    if not node_1 or not node_2:
+        st.warning("Please select both a source and a target node.")
+        return
 
     # Try to find the shortest path
     try:
@@ -122,61 +513,58 @@ def visualize_shortest_path(graph):
         st.error(f"No path exists between `{node_1}` and `{node_2}`")
 
 
-@time_and_memory
-def calculate_total_cost_with_weights(graph):
+def compute_total_cost(graph, start_node):
+    total_cost = 0
+    visited = set()
 
-    st.title("Total Cost Calculation for Manufacturing or Purchasing Parts")
+    # Use a DFS to explore all nodes connected to the start_node
+    stack = [start_node]
 
-    # Step 1: Filter nodes with the labels 'make_parts' or 'Purchase_Parts'
-    valid_nodes = [node for node, data in graph.nodes(data=True) if data.get('label') in ['make parts', 'Purchase_Parts']]
-    
-    # Step 2: Randomly sample 100 nodes or less if there aren't enough
-    if 'sampled_valid_nodes' not in st.session_state:
-        st.session_state['sampled_valid_nodes'] = random.sample(valid_nodes, min(100, len(valid_nodes)))
+    while stack:
+        node = stack.pop()
 
-    # Use the stored sampled nodes from session state
-    sampled_valid_nodes = st.session_state['sampled_valid_nodes']
+        if node in visited:
+            continue
+        visited.add(node)
 
-    # Step 3: Selectbox for valid nodes
-    start_node = st.selectbox("Select the Start Node (Product Node):", sampled_valid_nodes)
+        # Get the label of the current node
+        label = graph.nodes[node].get('label', '')
 
-    # Button to calculate the total cost
-    if st.button("Calculate Total Cost"):
-        if start_node:
-            total_cost = 0
-            visited = set()
+        # Add cost based on the node type
+        if label == 'make_parts':
+            manufacturing_cost = graph.nodes[node].get('manufacturing_cost', 0)
+            total_cost += manufacturing_cost
+        elif label == 'Purchase_Parts':
+            cost_per_unit = graph.nodes[node].get('cost_per_unit', 0)
+            available_quantity = graph.nodes[node].get('available_quantity', 0)
+            total_cost += cost_per_unit * available_quantity
 
-            # Use a DFS to explore all nodes connected to the start_node
-            stack = [start_node]
+            # Add the edge weight (cost) to this node
+            for neighbor in graph.neighbors(node):
+                edge_weight = graph.edges[node, neighbor].get('weight', 0)
+                total_cost += edge_weight  # Add edge weight to total cost
 
-            while stack:
-                node = stack.pop()
+        # Add connected nodes (children) to the stack to explore them
+        for neighbor in graph.neighbors(node):
+            if neighbor not in visited:
+                stack.append(neighbor)
 
-                if node in visited:
-                    continue
-                visited.add(node)
-
-                # Get the label of the current node
-                label = graph.nodes[node].get('label', '')
-
-                # Add cost based on the node type
-                if label == 'make_parts':
-                    manufacturing_cost = graph.nodes[node].get('manufacturing_cost', 0)
-                    total_cost += manufacturing_cost
-                elif label == 'Purchase_Parts':
-                    cost_per_unit = graph.nodes[node].get('cost_per_unit', 0)
-                    available_quantity = graph.nodes[node].get('available_quantity', 0)
-                    total_cost += cost_per_unit * available_quantity
-
-                    # Add the edge weight (cost) to this node
-                    for neighbor in graph.neighbors(node):
-                        edge_weight = graph.edges[node, neighbor].get('weight', 0)
-                        total_cost += edge_weight  # Add edge weight to total cost
-
-                # Add connected nodes (children) to the stack to explore them
-                for neighbor in graph.neighbors(node):
-                    if neighbor not in visited:
-                        stack.append(neighbor)
+    return total_cost
+
+
+@time_and_memory
+def calculate_total_cost_with_weights(graph, index):
+
+    st.title("Total Cost Calculation for Manufacturing or Purchasing Parts")
+
+    # Search among nodes with the labels 'make parts' or 'Purchase_Parts'
+    start_node = node_search("Select the Start Node (Product Node):", index,
+                             labels=['make parts', 'Purchase_Parts'], key="total_cost_node")
+
+    # Button to calculate the total cost
+    if st.button("Calculate Total Cost"):
+        if start_node:
+            total_cost = compute_total_cost(graph, start_node)
 
             # Display the total cost
             st.success(f"Total cost to manufacture or purchase parts for {start_node}: {total_cost}")
@@ -184,42 +572,34 @@ def calculate_total_cost_with_weights(graph):
             st.warning("Please enter a valid start node.")
 
 
-@time_and_memory
-def count_parts_needed(graph):
-    st.title("Parts Counter for Product Node")
+def count_parts(graph, product_node):
+    # Initialize counters
+    make_parts_count = 0
+    purchase_parts_count = 0
+
+    # Traverse the connected nodes without copying them into a new graph
+    for node in SubgraphView(graph, product_node, 1).nodes():
+        label = graph.nodes[node].get('label')
+        if label == 'make_parts':
+            make_parts_count += 1
+        elif label == 'Purchase_Parts':
+            purchase_parts_count += 1
+
+    return make_parts_count, purchase_parts_count
 
-    # Step 1: Filter nodes with labels 'make_parts' or 'Purchase_Parts'
-    valid_nodes = [node for node, data in graph.nodes(data=True) if data.get('label') in ['make parts', 'Purchase_Parts', 'Module']]
-    
-    # Step 2: Randomly sample 100 nodes or less if there aren't enough
-    if 'sampled_valid_nodes' not in st.session_state:
-        st.session_state['sampled_valid_nodes'] = random.sample(valid_nodes, min(100, len(valid_nodes)))
 
-    # Use the stored sampled nodes from session state
-    sampled_valid_nodes = st.session_state['sampled_valid_nodes']
+@time_and_memory
+def count_parts_needed(graph, index):
+    st.title("Parts Counter for Product Node")
 
-    # Step 3: Selectbox for valid nodes
-    product_node = st.selectbox("Select the Product Node:", sampled_valid_nodes)
+    # Search among parts and modules
+    product_node = node_search("Select the Product Node:", index,
+                               labels=['make parts', 'Purchase_Parts', 'Module'], key="count_parts_node")
 
     # Button to calculate
     if st.button("Count Parts"):
         if product_node:
-            # Labels of nodes
-            labels = nx.get_node_attributes(graph, 'label')
-
-            # Get the subgraph of connected nodes
-            subgraph = nx.ego_graph(graph, product_node)  # Get all connected nodes
-
-            # Initialize counters
-            make_parts_count = 0
-            purchase_parts_count = 0
-
-            # Traverse the nodes in the subgraph
-            for node in subgraph.nodes:
-                if labels.get(node) == 'make_parts':
-                    make_parts_count += 1
-                elif labels.get(node) == 'Purchase_Parts':
-                    purchase_parts_count += 1
+            make_parts_count, purchase_parts_count = count_parts(graph, product_node)
 
             # Display the results
             st.write(f"Make parts needed: {make_parts_count}")
@@ -228,73 +608,69 @@ def count_parts_needed(graph):
             st.write("Please select a valid product node.")
 
 
+def is_part_expired(graph, part_node):
+    # Returns None when the part has no manufacturing date
+    manufacturing_date = graph.nodes[part_node].get('date_manufacturing', None)
+    if not manufacturing_date:
+        return None
+
+    # Convert the manufacturing date to datetime object if it's not already
+    if isinstance(manufacturing_date, str):
+        manufacturing_date = datetime.strptime(manufacturing_date, "%Y-%m-%d")  # Assuming date is stored as 'YYYY-MM-DD'
+
+    # Calculate the difference in days from the current date
+    time_difference = datetime.now() - manufacturing_date
+
+    # Expiry check (if more than 1000 days have passed)
+    return time_difference.days > 1000
+
+
 @time_and_memory
-def check_part_expiration(graph):
+def check_part_expiration(graph, index):
     st.title("Part Expiration Checker")
 
-    # Step 1: Filter nodes with the label 'make parts'
-    make_parts_nodes = [node for node, data in graph.nodes(data=True) if data.get('label') == 'make parts']
-    
     # Check if there are any 'make parts' nodes
-    if not make_parts_nodes:
+    if 'make parts' not in index.labels():
         st.warning("No nodes found with the label 'make parts'.")
         return  # Exit the function if there are no nodes
 
-    # Check if 'sampled_expiry' exists in session state to avoid refreshing
-    if 'sampled_expiry' not in st.session_state:
-        # Randomly sample 100 nodes or fewer if there aren't enough
-        st.session_state['sampled_expiry'] = random.sample(make_parts_nodes, min(100, len(make_parts_nodes)))
-
-    # Use the stored sampled nodes from session state
-    sampled_expiry = st.session_state['sampled_expiry']
-
-    # Step 2: Selectbox for random sample of make_parts nodes
-    part_node = st.selectbox("Select the Part Node ID:", sampled_expiry)
+    # Step 1-2: Search among 'make parts' nodes
+    part_node = node_search("Select the Part Node ID:", index, labels=['make parts'], key="expiry_node")
 
     # Step 3: Button to check if the part has expired
     if st.button("Check Expiration Status"):
         if part_node:
             if part_node in graph.nodes:
-                manufacturing_date = graph.nodes[part_node].get('date_manufacturing', None)
-
-                if manufacturing_date:
-                    # Convert the manufacturing date to datetime object if it's not already
-                    if isinstance(manufacturing_date, str):
-                        manufacturing_date = datetime.strptime(manufacturing_date, "%Y-%m-%d")  # Assuming date is stored as 'YYYY-MM-DD'
-                    
-                    # Get the current date
-                    current_date = datetime.now()
-
-                    # Calculate the difference in days
-                    time_difference = current_date - manufacturing_date
-
-                    # Expiry check (if more than 1000 days have passed)
-                    if time_difference.days > 1000:
-                        st.success(f"The part {part_node} has expired.")
-                    else:
-                        st.success(f"The part {part_node} has not expired.")
-                else:
+                expired = is_part_expired(graph, part_node)
+
+                if expired is None:
                     st.warning(f"No manufacturing date available for part {part_node}.")
+                elif expired:
+                    st.success(f"The part {part_node} has expired.")
+                else:
+                    st.success(f"The part {part_node} has not expired.")
             else:
                 st.error(f"Part {part_node} does not exist in the graph.")
         else:
             st.warning("Please select a valid part node.")
 
 
-@time_and_memory
-def find_suppliers_for_purchase_part(graph):
-    # Step 1: Filter nodes with the label 'Purchase_Parts'
-    purchase_parts_nodes = [node for node, data in graph.nodes(data=True) if data.get('label') == 'Purchase_Parts']
-    
-    # Check if 'sampled_purchase_parts' exists in session state to avoid refreshing
-    if 'sampled_purchase_parts' not in st.session_state:
-        st.session_state['sampled_purchase_parts'] = random.sample(purchase_parts_nodes, min(100, len(purchase_parts_nodes)))
+def find_suppliers(graph, purchase_part_node):
+    suppliers = []
+
+    # Iterate through neighbors of the purchase part node
+    for neighbor in graph.neighbors(purchase_part_node):
+        # Check if the neighbor has the 'label' attribute indicating it is a supplier
+        if graph.nodes[neighbor].get('label') == 'Suppliers':
+            suppliers.append(neighbor)
 
-    # Use the stored sampled nodes from session state
-    sampled_purchase_parts = st.session_state['sampled_purchase_parts']
+    return suppliers
 
-    # Step 2: Selectbox for random sample of Purchase_Parts nodes
-    purchase_part_node = st.selectbox("Select Purchase Part Node ID:", sampled_purchase_parts)
+
+@time_and_memory
+def find_suppliers_for_purchase_part(graph, index):
+    # Step 1-2: Search among 'Purchase_Parts' nodes
+    purchase_part_node = node_search("Select Purchase Part Node ID:", index, labels=['Purchase_Parts'], key="supplier_node")
 
     # Step 3: Button to find suppliers
     if st.button("Find Suppliers"):
@@ -307,13 +683,7 @@ def find_suppliers_for_purchase_part(graph):
             st.warning(f"Node {purchase_part_node} not found in the graph.")
             return
 
-        suppliers = []
-
-        # Iterate through neighbors of the purchase part node
-        for neighbor in graph.neighbors(purchase_part_node):
-            # Check if the neighbor has the 'label' attribute indicating it is a supplier
-            if graph.nodes[neighbor].get('label') == 'Suppliers':
-                suppliers.append(neighbor)
+        suppliers = find_suppliers(graph, purchase_part_node)
 
         # Step 4: Display results
         if suppliers:
@@ -323,21 +693,11 @@ def find_suppliers_for_purchase_part(graph):
 
 
 @time_and_memory
-def get_quality_control_status_streamlit(graph):
+def get_quality_control_status_streamlit(graph, index):
     st.title("Check Quality Control Status")
 
-    # Get all nodes with the label 'make parts'
-    make_parts_nodes = [node for node, data in graph.nodes(data=True) if data.get('label') == 'make parts']
-    
-    # Check if 'sampled_quality' exists in session state to avoid refreshing
-    if 'sampled_quality' not in st.session_state:
-        st.session_state['sampled_quality'] = random.sample(make_parts_nodes, min(100, len(make_parts_nodes)))
-
-    # Use the stored sampled nodes from session state
-    sampled_nodes = st.session_state['sampled_quality']
-
-    # Dropdown to select from sampled 'make parts' nodes
-    part_id = st.selectbox("Select the Part ID:", sampled_nodes)
+    # Search among 'make parts' nodes
+    part_id = node_search("Select the Part ID:", index, labels=['make parts'], key="quality_node")
 
     # Button to check quality control status
     if st.button("Check Quality Control") and part_id:
@@ -353,23 +713,11 @@ def get_quality_control_status_streamlit(graph):
             st.error(f"Part ID: {part_id} not found in the graph.")
 
 @time_and_memory
-def display_node_features(graph):
+def display_node_features(graph, index):
     st.title("Node Features Viewer")
-    
-    # Check if 'sampled_nodes' exists in session state
-    if 'sampled_nodes' not in st.session_state:
-        all_nodes = list(graph.nodes)
-        # Sample only once and store in session state
-        if len(all_nodes) >100:
-            st.session_state['sampled_nodes'] = random.sample(all_nodes, 100)
-        else:
-            st.session_state['sampled_nodes']=all_nodes
 
-    # Use the stored sampled nodes from session state
-    sampled_nodes = st.session_state['sampled_nodes']
-    
-    # Use selectbox for displaying sampled node options
-    node_id = st.selectbox("Select the Node ID:", sampled_nodes)
+    # Search any node, optionally filtered by label
+    node_id = node_search("Select the Node ID:", index, key="features_node")
 
     # If a node is selected
     if st.button("Check Node Attributes") and node_id:
@@ -387,84 +735,416 @@ def display_node_features(graph):
                 st.warning(f"Node {node_id} has no attributes.")
         else:
             st.error(f"Node ID {node_id} not found in the graph.")
+
+
+@time_and_memory
+def show_critical_path(graph, index, critical_path):
+    st.title("Critical Path Lead Time")
+
+    # Product families and series hang directly off the root
+    families = list(graph.successors("Business Group"))
+    dataset = st.session_state.get('partitioned_dataset')
+    rows = []
+    for family in families:
+        for node in [family] + list(graph.successors(family)):
+            total, path = critical_path.lookup(node)
+            row = {'node': node, 'lead_time_days': total, 'path_length': len(path), 'leaf': path[-1]}
+            if dataset is not None:
+                # Totals only cover the partitions loaded so far
+                partitions = dataset.partitions_for(node)
+                loaded = len(dataset.loaded.intersection(partitions))
+                if partitions and not loaded:
+                    row.update(lead_time_days=None, path_length=None, leaf=None, loaded="not loaded")
+                elif loaded < len(partitions):
+                    row['loaded'] = f"{loaded} of {len(partitions)} partitions"
+                else:
+                    row['loaded'] = "loaded"
+            rows.append(row)
+    st.subheader("Product families and series")
+    if dataset is not None and len(dataset.loaded) < len(dataset.partitions):
+        st.caption("Lead times of partly loaded families are a lower bound until the rest of the family is loaded.")
+    st.dataframe(rows)
+
+    # Schedule risk for any node is a lookup into the precomputed totals
+    node_id = node_search("Select a node for schedule risk:", index, key="critical_path_node")
+    if node_id is not None and node_id in graph:
+        total, path = critical_path.lookup(node_id)
+        st.success(f"Longest lead/manufacturing time below {node_id}: {total} days")
+        st.write(" → ".join(f"{step} ({own_lead_time(graph.nodes[step])}d)" for step in path))
+
+        # Children ranked by their own critical time
+        children = heapq.nlargest(10, graph.successors(node_id), key=lambda child: critical_path.total.get(child, 0))
+        if children:
+            st.subheader("Slowest branches")
+            st.dataframe([{'node': child, 'label': graph.nodes[child].get('label'),
+                           'lead_time_days': critical_path.total.get(child, 0)} for child in children])
+
+
+def row_to_node(row):
+    # Module files are told apart by their header ('Edge_weight' vs 'Edge_Weight')
+    if 'Edge_weight' in row:
+        node_id = row['ID']
+        parent_id = row['ParentID'] if row['ParentID'] else None
+        edge_weight = row['Edge_weight']
+        attributes = {'name': row['Name'], 'label': row['Label'], 'edge_weight': edge_weight}
+        return node_id, parent_id, attributes, edge_weight
+
+    node_id = row['ID']
+    parent_id = row['ParentID'] if row['ParentID'] else None
+    node_type = row['Label']
+
+    # Common attributes
+    attributes = {
+        'name': row['Name'],
+        'label': node_type,
+        'edge_weight': int(row['Edge_Weight'])
+    }
+
+    # Add type-specific attributes
+    if node_type == 'make parts':
+        attributes.update({
+            'date_manufacturing': datetime.strptime(row['Attribute1'], '%Y-%m-%d'),
+            'available_quantity': int(row['Attribute2']),
+            'manufacturing_cost': float(row['Attribute3']),
+            'manufacturing_time': int(row['Attribute4']),
+            'quality_control_status': row['Attribute5']
+        })
+
+    elif node_type == 'Purchase_Parts':
+        attributes.update({
+            'supplier_id': row['Attribute1'],
+            'date_purchased': datetime.strptime(row['Attribute2'], '%Y-%m-%d'),
+            'available_quantity': int(row['Attribute3']),
+            'cost_per_unit': float(row['Attribute4']),
+            'lead_time': int(row['Attribute5']),
+        })
+
+    elif node_type == 'Suppliers':
+        attributes.update({
+            'contact_details': row['Attribute1'],
+            'location': row['Attribute2']
+        })
+
+    return node_id, parent_id, attributes, attributes['edge_weight']
+
+
 # @time_and_memory
 @st.cache_resource
 def add_nodes_from_csv(_graph, all_csv):
-    module = True
-    
     for csv_filename in all_csv:
-    
+
         # Read CSV from memory (uploaded files)
         reader = csv.DictReader(io.StringIO(csv_filename.getvalue().decode('utf-8')))
-        
-        for row in reader:
-            if module:
-                node_id = row['ID']
-                parent_id = row['ParentID'] if row['ParentID'] else None
-                node_type = row['Label']
-                edge_weight = row['Edge_weight']
-                name = row['Name']
-
-                # Add node with attributes
-                _graph.add_node(node_id, name=name, label=node_type, edge_weight=edge_weight)
-                if parent_id:
-                    _graph.add_edge(parent_id, node_id, weight=edge_weight)
-                continue
 
-            node_id = row['ID']
-            parent_id = row['ParentID'] if row['ParentID'] else None
-            node_type = row['Label']
-
-            # Common attributes
-            attributes = {
-                'name': row['Name'],
-                'label': node_type,
-                'edge_weight': int(row['Edge_Weight'])
-            }
-
-            # Add type-specific attributes
-            if node_type == 'make parts':
-                attributes.update({
-                    'date_manufacturing': datetime.strptime(row['Attribute1'], '%Y-%m-%d'),
-                    'available_quantity': int(row['Attribute2']),
-                    'manufacturing_cost': float(row['Attribute3']),
-                    'manufacturing_time': int(row['Attribute4']),
-                    'quality_control_status': row['Attribute5']
-                })
-
-            elif node_type == 'Purchase_Parts':
-                attributes.update({
-                    'supplier_id': row['Attribute1'],
-                    'date_purchased': datetime.strptime(row['Attribute2'], '%Y-%m-%d'),
-                    'available_quantity': int(row['Attribute3']),
-                    'cost_per_unit': float(row['Attribute4']),
-                    'lead_time': int(row['Attribute5']),
-                })
-
-            elif node_type == 'Suppliers':
-                attributes.update({
-                    'contact_details': row['Attribute1'],
-                    'location': row['Attribute2']
-                })
+        for row in reader:
+            node_id, parent_id, attributes, edge_weight = row_to_node(row)
 
             # Add node with attributes
             _graph.add_node(node_id, **attributes)
-            
+
             # If the node has a parent, create an edge between the parent and the node
             if parent_id:
-                _graph.add_edge(parent_id, node_id, weight=attributes['edge_weight'])
-
-        module = False
+                _graph.add_edge(parent_id, node_id, weight=edge_weight)
 
     return _graph
 
-# Streamlit app for querying
-def app():
-    st.title("Graph Querying Page")
 
-    # Step 1: Upload CSV files
-    uploaded_files = st.file_uploader("Upload CSV files", type="csv", accept_multiple_files=True)
+CHUNK_SIZE = 1 << 20   # bytes read from an upload at a time
+BATCH_ROWS = 5000      # rows added to the graph per lock acquisition
+
+
+def iter_csv_lines(source, chunk_size=CHUNK_SIZE, on_chunk=None):
+    # Decode a binary file object one chunk at a time so that a whole upload
+    # is never held as a single decoded string
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    source.seek(0)
+    tail = ''
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if on_chunk:
+            on_chunk(len(chunk))
+        lines = (tail + decoder.decode(chunk)).split('\n')
+        tail = lines.pop()  # last piece may be an incomplete line
+        for line in lines:
+            yield line + '\n'
+    tail += decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+class LocalUpload:
+    # A CSV on disk described like a Streamlit UploadedFile, for IngestionJob.submit.
+    # Only the metadata is kept; the file is opened while the job reads it.
+    def __init__(self, path, name=None):
+        stat = os.stat(path)
+        self.path = path
+        self.name = name or os.path.basename(path)
+        self.size = stat.st_size
+        self.file_id = f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def open(self):
+        return open(self.path, 'rb')
+
+
+def open_upload(source):
+    # Files on disk are open only while they are read; uploads are already in memory
+    return source.open() if isinstance(source, LocalUpload) else contextlib.nullcontext(source)
+
+
+def level_sort_key(name):
+    # Load the modules file first, then level_5.csv, level_6.csv, ...
+    match = re.search(r'level_(\d+)', name)
+    return (int(match.group(1)) if match else float('inf'), name)
+
+
+def file_fingerprint(source, chunk_size=CHUNK_SIZE):
+    # Content hash of a binary file object, read in chunks
+    digest = hashlib.sha1()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IngestionJob:
+    """Builds the graph from uploaded CSVs on a background thread.
+
+    Files are parsed in fixed-size chunks and added in batches of rows. Queries
+    hold ``lock`` while they read ``graph``, so they see every level loaded so far.
+
+    Each file is fingerprinted and the node IDs it contributed are remembered, so
+    a new or modified file only applies its own additions, removals and attribute
+    changes. Callables in ``listeners`` are called under ``lock`` with the graph
+    and the changes of every file that is applied, to keep derived indexes in step.
+    """
+
+    def __init__(self, graph, chunk_size=CHUNK_SIZE):
+        self.graph = graph
+        self.lock = threading.RLock()
+        self.chunk_size = chunk_size
+        self.listeners = []
+        self.loaded_files = []
+        self.current_file = None
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.rows_done = 0
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self._fingerprints = {}  # file name -> content hash
+        self._file_nodes = {}    # file name -> set of node IDs defined by that file
+        self._base_nodes = set(graph)  # present before any upload, never removed
+        self._tasks = deque()
+        self._submitted = {}     # file name -> file_id of the last queued upload
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self._worker is None
+
+    def rows_per_second(self):
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.rows_done / elapsed if elapsed > 0 else 0.0
+
+    def submit(self, uploaded_files):
+        # Queue uploads that are new or were replaced, and the removal of files that
+        # left the uploader; re-running the page with the same uploads is a no-op
+        current = {f.name: f for f in uploaded_files}
+        changed = [f for f in uploaded_files if self._submitted.get(f.name) != f.file_id]
+        removed = [name for name in self._submitted if name not in current]
+        if not changed and not removed:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self.bytes_total = self.bytes_done = self.rows_done = 0
+                self.error = None
+            for name in removed:
+                del self._submitted[name]
+                self._tasks.append((name, None))
+            for uploaded_file in sorted(changed, key=lambda f: level_sort_key(f.name)):
+                self._submitted[uploaded_file.name] = uploaded_file.file_id
+                self._tasks.append((uploaded_file.name, uploaded_file))
+                self.bytes_total += uploaded_file.size
+            if self._worker is None:
+                self.started_at = time.time()
+                self.finished_at = None
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._worker_lock:
+                if not self._tasks:
+                    self.current_file = None
+                    self.finished_at = time.time()
+                    self._worker = None
+                    return
+                name, source = self._tasks.popleft()
+            self.current_file = name
+            try:
+                if source is None:
+                    self._remove_file(name)
+                else:
+                    self._load_file(name, source)
+            except Exception as e:  # surfaced on the page by show_ingestion_progress
+                self.error = f"{name}: {e}"
+
+    def _on_chunk(self, nbytes):
+        self.bytes_done += nbytes
+
+    def _load_file(self, name, source):
+        with open_upload(source) as file:
+            self._load_opened_file(name, source.size, file)
+
+    def _load_opened_file(self, name, size, file):
+        fingerprint = file_fingerprint(file, self.chunk_size)
+        if self._fingerprints.get(name) == fingerprint:
+            # Same content re-uploaded under a new file_id
+            self.bytes_done += size
+            return
 
+        changes = {'added': set(), 'updated': set(), 'removed': {}}
+        seen = set()
+        complete = False
+        try:
+            reader = csv.DictReader(iter_csv_lines(file, self.chunk_size, self._on_chunk))
+            batch = []
+            for row in reader:
+                batch.append(row_to_node(row))
+                if len(batch) >= BATCH_ROWS:
+                    self._apply_batch(batch, seen, changes)
+                    batch = []
+            self._apply_batch(batch, seen, changes)
+            complete = True
+        finally:
+            with self.lock:
+                previous = self._file_nodes.get(name, set())
+                if complete:
+                    # Nodes the previous version of this file defined but the new one does not
+                    self._file_nodes[name] = seen
+                    self._remove_nodes(previous - seen, changes)
+                    self._fingerprints[name] = fingerprint
+                    if name in self.loaded_files:
+                        self.loaded_files.remove(name)
+                    self.loaded_files.append(name)
+                else:
+                    # Batches applied before the failure stay; remember them so the file
+                    # can still be replaced or removed, and let a re-upload retry it
+                    self._file_nodes[name] = previous | seen
+                    self._fingerprints.pop(name, None)
+                self._remove_orphans(changes)
+                self._notify(changes)
+
+    def _remove_file(self, name):
+        changes = {'added': set(), 'updated': set(), 'removed': {}}
+        with self.lock:
+            self._remove_nodes(self._file_nodes.pop(name, set()), changes)
+            self._remove_orphans(changes)
+            self._fingerprints.pop(name, None)
+            if name in self.loaded_files:
+                self.loaded_files.remove(name)
+            self._notify(changes)
+
+    def _apply_batch(self, batch, seen, changes):
+        graph = self.graph
+        with self.lock:
+            for node_id, parent_id, attributes, edge_weight in batch:
+                seen.add(node_id)
+                if node_id not in graph:
+                    graph.add_node(node_id, **attributes)
+                    changes['added'].add(node_id)
+                else:
+                    data = graph.nodes[node_id]
+                    if data != attributes:
+                        data.clear()
+                        data.update(attributes)
+                        changes['updated'].add(node_id)
+                    # Drop edges from a parent the row no longer names
+                    for old_parent in [p for p in graph.predecessors(node_id) if p != parent_id]:
+                        graph.remove_edge(old_parent, node_id)
+                        changes['updated'].add(node_id)
+                        changes['updated'].add(old_parent)  # it lost a child
+                if parent_id:
+                    if parent_id not in graph:
+                        # add_edge creates the parent bare until its own row is loaded
+                        changes['added'].add(parent_id)
+                    edge = graph.get_edge_data(parent_id, node_id)
+                    if edge is None or edge.get('weight') != edge_weight:
+                        graph.add_edge(parent_id, node_id, weight=edge_weight)
+                        if node_id not in changes['added']:
+                            changes['updated'].add(node_id)
+        self.rows_done += len(batch)
+
+    def _remove_nodes(self, node_ids, changes):
+        graph = self.graph
+        node_ids = {node_id for node_id in node_ids if node_id in graph}
+        for node_id in node_ids:
+            parents = list(graph.predecessors(node_id))
+            if any(child not in node_ids for child in graph.successors(node_id)):
+                # Rows of other files still hang off this node: keep it bare with its
+                # child edges, as a fresh load of the remaining files would
+                graph.nodes[node_id].clear()
+                for parent in parents:
+                    graph.remove_edge(parent, node_id)
+                changes['updated'].add(node_id)
+                changes['updated'].update(parents)  # they lost a child
+            else:
+                changes['removed'][node_id] = parents
+                graph.remove_node(node_id)
+        changes['updated'] -= changes['removed'].keys()
+
+    def _remove_orphans(self, changes):
+        # A node no file defines only exists for the rows below it (add_edge created it,
+        # or its file was removed); drop it, and then its own parents, once none are left
+        graph = self.graph
+        candidates = list(changes['updated'])
+        candidates.extend(parent for parents in changes['removed'].values() for parent in parents)
+        while candidates:
+            node_id = candidates.pop()
+            if node_id not in graph or node_id in self._base_nodes or graph.nodes[node_id] \
+                    or graph.out_degree(node_id) \
+                    or any(node_id in nodes for nodes in self._file_nodes.values()):
+                continue
+            parents = list(graph.predecessors(node_id))
+            changes['removed'][node_id] = parents
+            graph.remove_node(node_id)
+            candidates.extend(parents)
+        changes['added'] -= changes['removed'].keys()
+        changes['updated'] -= changes['removed'].keys()
+
+    def _notify(self, changes):
+        if changes['added'] or changes['updated'] or changes['removed']:
+            for listener in self.listeners:
+                listener(self.graph, changes)
+
+
+def show_ingestion_progress(job):
+    fraction = job.bytes_done / job.bytes_total if job.bytes_total else 1.0
+    status = "Loading " + job.current_file if job.current_file else "Graph loaded"
+    st.progress(min(fraction, 1.0), text=f"{status} ({fraction:.0%})")
+    ready = job.loaded_files
+    if len(ready) > 4:
+        ready = [f"{len(ready)} files, latest {ready[-1]}"]
+    st.caption(f"{job.rows_done:,} rows loaded · {job.rows_per_second():,.0f} rows/sec · "
+               f"levels ready: {', '.join(ready) or 'none yet'}")
+    if job.error:
+        st.error(f"Failed to load {job.error}")
+
+
+@st.fragment(run_every=1.0)
+def live_ingestion_progress(job):
+    show_ingestion_progress(job)
+    if job.done:
+        # One full rerun so the rest of the page stops polling
+        st.rerun()
+
+
+def build_base_graph():
     # Initialize an empty graph
     G = nx.DiGraph()
 
@@ -484,37 +1164,163 @@ def app():
             G.add_node(child_node)
             G.add_edge(parent_node, child_node)
 
-    # Step 2: Add nodes from uploaded CSVs
-    if uploaded_files:
+    return G
+
+def new_ingestion_job():
+    job = IngestionJob(build_base_graph())
+    # Built at load time and kept up to date as each file is applied
+    job.search_index = NodeSearchIndex(job.graph)
+    job.listeners.append(job.search_index.apply_changes)
+    job.critical_path = CriticalPathIndex(job.graph)
+    job.listeners.append(job.critical_path.apply_changes)
+    return job
+
+
+PARTITION_MANIFEST = "partition_manifest.json"
+
+
+class PartitionedDataset:
+    """A generated BOM split by product family and series, loaded on demand.
+
+    Reads the partition manifest written by the generator's partitioned layout and
+    queues a partition's files on ``job`` only when the user asks for it, so memory
+    and load time follow the part of the BOM in use.
+    """
+
+    def __init__(self, folder, job):
+        self.folder = folder
+        self.job = job
+        with open(os.path.join(folder, PARTITION_MANIFEST)) as file:
+            self.partitions = {entry['node']: entry for entry in json.load(file)['partitions']}
+        self.loaded = set()
+        self._uploads = {}  # file path -> LocalUpload, kept so resubmitting is a no-op
+
+    def scopes(self):
+        # Families followed by their series, as offered in the scope picker
+        families = sorted({entry['family'] for entry in self.partitions.values()})
+        return families + sorted(self.partitions)
+
+    def partitions_for(self, node):
+        # A series or a whole family; the root maps to nothing so it never loads the full BOM
+        if node in self.partitions:
+            return [node]
+        return [name for name, entry in self.partitions.items() if entry['family'] == node]
+
+    def load(self, partition_nodes):
+        # Queue any of the partitions not loaded yet; returns True if something was queued
+        new = set(partition_nodes) - self.loaded
+        if not new:
+            return False
+        self.loaded |= new
+        for name in new:
+            for entry in self.partitions[name]['files']:
+                path = os.path.join(self.folder, entry['path'])
+                self._uploads[path] = LocalUpload(path, name=entry['path'])
+        # submit() unloads files missing from the list, so always pass every loaded one
+        self.job.submit(list(self._uploads.values()))
+        return True
+
+    def loaded_bytes(self):
+        return sum(self.partitions[name]['bytes'] for name in self.loaded)
+
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self.partitions.values())
+
+
+# Streamlit app for querying
+def app():
+    st.title("Graph Querying Page")
+
+    source = st.radio("Data source:", ["Upload CSV files", "Partitioned dataset folder"], horizontal=True)
+    # Progress is drawn here once the query below has had a chance to load its scope
+    progress_slot = st.container()
+    job = None
+
+    if source == "Partitioned dataset folder":
+        # Step 1: Point at the generator's partitioned output
+        folder = st.text_input("Dataset folder:", value=".",
+                               help=f"Folder holding the {PARTITION_MANIFEST} written by the generator")
+        if not os.path.exists(os.path.join(folder, PARTITION_MANIFEST)):
+            st.warning(f"No {PARTITION_MANIFEST} found in {os.path.abspath(folder)}.")
+            return
+
+        dataset = st.session_state.get('partitioned_dataset')
+        if dataset is None or dataset.folder != folder:
+            dataset = PartitionedDataset(folder, new_ingestion_job())
+            st.session_state['partitioned_dataset'] = dataset
+        job = dataset.job
+
+        # Step 2: Load the chosen families or series; a query's node can load its own scope
+        for scope in st.multiselect("Load product families or series:", dataset.scopes()):
+            dataset.load(dataset.partitions_for(scope))
+        graph, graph_lock = job.graph, job.lock
+        index, critical_path = job.search_index, job.critical_path
+
+    else:
+        st.session_state.pop('partitioned_dataset', None)
+
+        # Step 1: Upload CSV files
+        uploaded_files = st.file_uploader("Upload CSV files", type="csv", accept_multiple_files=True)
+
+        streaming = st.checkbox("Stream uploads in the background", value=True,
+                                help="Parse uploads in chunks on a background thread and query levels as they finish loading")
+
+        if not uploaded_files:
+            st.warning("Please upload CSV files to add nodes to the graph.")
+            return
+
+        # Step 2: Add nodes from uploaded CSVs
         st.success("CSV files uploaded successfully!")
-        graph = add_nodes_from_csv(G, uploaded_files)
-        st.success("Graph converted from CSV successfully!")
+        if streaming:
+            if 'ingestion_job' not in st.session_state:
+                st.session_state['ingestion_job'] = new_ingestion_job()
+            job = st.session_state['ingestion_job']
+            job.submit(uploaded_files)
+            graph, graph_lock = job.graph, job.lock
+            index, critical_path = job.search_index, job.critical_path
+        else:
+            graph = add_nodes_from_csv(build_base_graph(), uploaded_files)
+            graph_lock = threading.RLock()
+            index = build_search_index(graph, uploaded_files)
+            critical_path = build_critical_path_index(graph, uploaded_files)
+            st.success("Graph converted from CSV successfully!")
 
-        
+    options = ["Select an option","Statistics", "Subgraph", "Visualize Shortest Path", "Total Cost", "Expiry Date", "Find Supplier", "Quality Control Status", "Node Features", "Critical Path"]
+    selected_option = st.selectbox("Choose a query:", options)
 
-        options = ["Select an option","Statistics", "Subgraph", "Visualize Shortest Path", "Total Cost", "Expiry Date", "Find Supplier", "Quality Control Status", "Node Features"]
-        selected_option = st.selectbox("Choose a query:", options)
+    # Hold the lock so the background loader cannot mutate the graph mid-query
+    with graph_lock:
         if selected_option == "Statistics":
             statistics(graph)
         elif selected_option == "Subgraph":
-            subgraph(graph)
+            subgraph(graph, index)
         elif selected_option == "Visualize Shortest Path":
-            visualize_shortest_path(graph)
+            visualize_shortest_path(graph, index)
         # elif selected_option == "Count Parts":
-        #     count_parts_needed(graph)
+        #     count_parts_needed(graph, index)
         elif selected_option=="Total Cost":
-            calculate_total_cost_with_weights(graph)
+            calculate_total_cost_with_weights(graph, index)
         elif selected_option=="Expiry Date":
-            check_part_expiration(graph)
+            check_part_expiration(graph, index)
         elif selected_option=="Find Supplier":
-            find_suppliers_for_purchase_part(graph)
+            find_suppliers_for_purchase_part(graph, index)
         elif selected_option=="Quality Control Status":
-            get_quality_control_status_streamlit(graph)
+            get_quality_control_status_streamlit(graph, index)
         elif selected_option=="Node Features":
-            display_node_features(graph)
-
-    else:
-        st.warning("Please upload CSV files to add nodes to the graph.")
+            display_node_features(graph, index)
+        elif selected_option=="Critical Path":
+            show_critical_path(graph, index, critical_path)
+
+    if job is not None:
+        with progress_slot:
+            dataset = st.session_state.get('partitioned_dataset')
+            if dataset is not None:
+                st.caption(f"{len(dataset.loaded)} of {len(dataset.partitions)} partitions loaded "
+                           f"({dataset.loaded_bytes() / 2**20:.1f} of {dataset.total_bytes() / 2**20:.1f} MiB)")
+            if not job.done:
+                live_ingestion_progress(job)
+            elif dataset is None or dataset.loaded:
+                show_ingestion_progress(job)
 
 
 # Run the app